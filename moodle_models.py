@@ -1,14 +1,17 @@
 from collections import defaultdict
 import csv
-import doctest
+from itertools import chain
+from operator import attrgetter
 from pathlib import Path
-
-from bs4 import BeautifulSoup
+import re
+import sys
 
 import moodle_workshop_report_parser as mwrp
 from util import normalize
 
 SEPARATOR = '#'
+# Splits a comma-separated list of group IDs, stripping the IDs
+_GROUP_ID_SEPARATOR = re.compile(r'\s*,\s*')
 
 class User():
     """
@@ -78,6 +81,16 @@ class User():
     User('Alice Smith', 345678)
     
     """
+    __slots__ = (
+        'first_name',
+        'last_name',
+        'full_name',
+        'id_number',
+        'email',
+        '_group_ids',
+        '_sort_key',
+    )
+
     def __init__(
             self,
             first_name,
@@ -88,10 +101,18 @@ class User():
         ):
         self.first_name = first_name
         self.last_name = last_name
-        self.full_name = f'{self.first_name} {self.last_name}'
+        # Full names are used as keys of the grades dictionaries, whose
+        # keys are interned by `mwrp.extract_grades` too
+        self.full_name = sys.intern(f'{self.first_name} {self.last_name}')
         self.id_number = id_number
         self.email = email
         self.group_ids = group_ids
+        # Normalizing is costly and sorting compares each user many times
+        self._sort_key = (
+            normalize(self.last_name),
+            normalize(self.first_name),
+            self.id_number,
+        )
     
     
     @property
@@ -106,7 +127,8 @@ class User():
         elif isinstance(ids, str):
             self._group_ids = (ids,)
         elif isinstance(ids, (list, tuple)):
-            valid_ids = set(str(id_) for id_ in ids if id_ not in (['', None]))
+            valid_ids = dict.fromkeys(str(id_) for id_ in ids
+                                      if id_ not in ('', None))
             self._group_ids = tuple(sorted(valid_ids, key=normalize))
         else:
             raise ValueError('Invalid group IDs')
@@ -159,17 +181,7 @@ class User():
         True
         
         """
-        tup_self = (
-            normalize(self.last_name),
-            normalize(self.first_name),
-            self.id_number,
-        )
-        tup_other = (
-            normalize(other.last_name),
-            normalize(other.first_name),
-            other.id_number,
-        )
-        return tup_self < tup_other
+        return self._sort_key < other._sort_key
 
 
 class Group():
@@ -222,27 +234,31 @@ class Group():
     (User('Sally Smith', 222222),)
     
     """
+    __slots__ = ('group_id', 'members', '_sort_key')
+
     def __init__(self, group_id, members=None):
         self.group_id = group_id
         if members is None:
             self.members = ()
         else:
             lst = [user for user in members if group_id in user.group_ids]
-            self.members = tuple(sorted(lst))
+            self.members = tuple(sorted(lst, key=attrgetter('_sort_key')))
+        self._sort_key = (normalize(self.group_id), self.members)
+
+    @classmethod
+    def _from_sorted_members(cls, group_id, members):
+        """Build a group from users already known to be its members,
+        in sorted order, skipping the filtering and sorting steps."""
+        group = cls(group_id)
+        group.members = tuple(members)
+        group._sort_key = (normalize(group_id), group.members)
+        return group
 
     def __repr__(self):
         return f'{self.__class__.__name__}({self.group_id!r})'
 
     def __lt__(self, other):
-        tup_self = (
-            normalize(self.group_id),
-            self.members,
-        )
-        tup_other = (
-            normalize(other.group_id),
-            other.members,
-        )
-        return tup_self < tup_other
+        return self._sort_key < other._sort_key
 
 
 class Course():
@@ -308,6 +324,19 @@ class Course():
     Group('X')
     Group('Y')
 
+    Groups are sorted alphabetically by their normalized IDs:
+
+    >>> user7 = User('Ann', 'Lee', 777777, 'ann@nomail.com',
+    ...              ["O'Neil", 'Group 1 (bis)'])
+    >>> user8 = User('Tom', 'Ray', 888888, 'tom@nomail.com', ['Group 1', 'a'])
+    >>> for group in Course(12345, [user7, user8]).groups:
+    ...     print(group)
+    ...
+    Group('a')
+    Group('Group 1')
+    Group('Group 1 (bis)')
+    Group("O'Neil")
+
     >>> csv_file = Path('.', f'{course_id}{SEPARATOR}participants.csv')
     >>> header = '"First name","Last name","ID number","Email address",Groups'
     >>> with open(csv_file, 'w') as f:
@@ -357,7 +386,8 @@ class Course():
     
     def __init__(self, course_id, users):
         self.course_id = course_id
-        self.users = tuple(sorted(users))
+        # Same order as `User.__lt__`, without a Python call per compare
+        self.users = tuple(sorted(users, key=attrgetter('_sort_key')))
         self.groups = self.get_groups()
         
     def __repr__(self):
@@ -368,9 +398,11 @@ class Course():
         for user in self.users:
             for group_id in user.group_ids:
                 mapping[group_id].append(user)
-        groups = [Group(group_id, users)
-                  for group_id, users in mapping.items()]
-        return tuple(sorted(groups, key=lambda g: normalize(repr(g))))
+        # `self.users` is sorted, and so are the members of each group.
+        # Group IDs are unique, hence sorting them is enough to sort
+        # the groups
+        return tuple(Group._from_sorted_members(group_id, mapping[group_id])
+                     for group_id in sorted(mapping, key=normalize))
         
     @classmethod
     def from_participants_csv(cls, course_id, data_folder):
@@ -395,11 +427,10 @@ class Course():
                     print(err_msg)
                     id_number = None
                 email = line[cls.idx_email].strip()
-                valid_ids = set()
-                for raw_id in line[cls.idx_group_ids].split(','):
-                    valid_ids.add(raw_id.strip())
-                valid_ids.discard('')
-                group_ids = sorted(valid_ids, key=normalize)
+                # Empty and duplicated IDs are discarded and the rest
+                # sorted by the `User.group_ids` setter
+                raw_ids = line[cls.idx_group_ids].strip()
+                group_ids = _GROUP_ID_SEPARATOR.split(raw_ids)
                 user = User(first_name, last_name, id_number, email, group_ids)
                 users.append(user)
         return cls(course_id, users)
@@ -425,7 +456,10 @@ class Workshop():
     html_path : pathlib.Path
         Path to the HTML report file exported from Moodle.
     soup : bs4.BeautifulSoup
-        Parsed HTML content of the workshop report.
+        Parsed HTML content of the workshop report (scripts
+        excluded).
+    report : mwrp.ParsedReport
+        General information extracted from the report.
     workshop_title : str
         Title of the workshop, as shown in the report.
     course : Course
@@ -438,17 +472,25 @@ class Workshop():
         'submitted', 'received', 'given', 'submission' and 'grading'.
     grades : dict of str to dict
         Computed grades for each user. Each key is a user's ID; 
-        each value is a dictionary with keys 'submission' and
-        'overall', representing the group submission score 
-        and the total grade (submission + assessment).
+        each value is a dictionary with keys 'submission', 'grading'
+        and 'overall', representing the group submission score, the
+        assessment grade and the total grade (submission +
+        assessment).
     """
     def __init__(self, html_path):
         self.html_path = html_path
-        self.soup = self.get_soup()
-        self.workshop_title = mwrp.extract_workshop_title(self.soup)
+        html_content = self.read_html()
+        # The course ID is searched for in `html_content`, hence the
+        # scripts of the page do not need to be parsed
+        self.soup = self.get_soup(
+            html_content,
+            parse_only=mwrp.REPORT_NO_SCRIPT_STRAINER,
+        )
+        self.report = mwrp.ParsedReport(self.soup, html_content)
+        self.workshop_title = self.report.workshop_title
         self.course = self.get_course()
-        self.group_ids = mwrp.extract_group_ids(self.soup)
-        self.grades_from_report = mwrp.extract_grades(self.soup)
+        self.group_ids = self.report.group_ids
+        self.grades_from_report = self.report.grades
         # Since not all enrolled users necessarily participate in the
         # workshop, the number of graded users may differ from the
         # total number of users, and as a consequence, the following
@@ -464,10 +506,33 @@ class Workshop():
         workshop_id = parts[-1]
         return f'{class_}({course_id=}, {workshop_id=})'
 
-    def get_soup(self):
+    def read_html(self):
+        """
+        Read the HTML code of the grades report.
+
+        Returns
+        -------
+        str
+            Content of the file located at `self.html_path`.
         """
-        Read the specified HTML file and parse its content using 
-        BeautifulSoup with the 'lxml' parser.
+        with open(self.html_path, 'r', encoding='utf-8') as file:
+            return file.read()
+
+
+    def get_soup(self, html_content=None,
+                 parse_only=mwrp.REPORT_STRAINER):
+        """
+        Parse the HTML code of the grades report using 
+        `mwrp.make_soup`, i.e. BeautifulSoup with the 'lxml' parser.
+
+        Parameters
+        ----------
+        html_content : str or None, optional
+            HTML code of the report. If `None`, the specified HTML
+            file is read.
+        parse_only : bs4.SoupStrainer or None, optional
+            Sections of the page to be parsed, passed on to
+            `mwrp.make_soup`. Defaults to `mwrp.REPORT_STRAINER`.
     
         Returns
         -------
@@ -475,9 +540,9 @@ class Workshop():
             Parsed HTML content of the grades report, used
             internally for extracting information.
         """
-        with open(self.html_path, 'r', encoding='utf-8') as file:
-            html_content = file.read()
-        return BeautifulSoup(html_content, 'lxml')
+        if html_content is None:
+            html_content = self.read_html()
+        return mwrp.make_soup(html_content, parse_only)
         
     
     def get_course(self):
@@ -502,7 +567,7 @@ class Workshop():
         the CSV participant list.
         
         """
-        course_id = mwrp.extract_course_id(self.soup)
+        course_id = self.report.course_id
         data_folder = self.html_path.parent
         course_obj = Course.from_participants_csv(course_id, data_folder)
         return course_obj
@@ -521,8 +586,9 @@ class Workshop():
         groups : list of Group
             Groups matched by ID as listed in the workshop report.
         """
+        report_group_ids = set(self.group_ids)
         groups = [group for group in self.course.groups
-                  if group.group_id in self.group_ids]
+                  if group.group_id in report_group_ids]
         return groups
 
 
@@ -553,39 +619,40 @@ class Workshop():
     
         """
         grades = dict()
+        grades_from_report = self.grades_from_report
         workshop_groups = self.get_workshop_groups()
         for group in workshop_groups:
-            full_names = [member.full_name for member in group.members]
-            received = []
-            for full_name in full_names:
-                # As a student cannot belong to more than one group,
-                # we can initialize the value associated with its
-                # full name (the key) with an empty dictionary
-                grades[full_name] = dict()
-                mapping = self.grades_from_report[full_name]
-                # Storing the received grades in a list rather than
-                # in a dictionary makes it possible that the number
-                # of graders could be less than the number of grades
-                # (for instance, if a student is assigned the
-                # submissions of two members of the same group).
-                received.extend(mapping['received'].values())
-            if received:
-                group_grade = sum(received)/len(received)
+            # Each member's report entry is looked up just once
+            members = [(member.full_name, grades_from_report[member.full_name])
+                       for member in group.members]
+            # Counting the received grades rather than the graders
+            # makes it possible that the number of graders could be
+            # less than the number of grades (for instance, if a
+            # student is assigned the submissions of two members of
+            # the same group). The grades are summed in a single
+            # `sum` call, member after member, without being copied
+            # into a list first.
+            received = [mapping['received'].values()
+                        for full_name, mapping in members]
+            n_received = sum(map(len, received))
+            if n_received:
+                group_grade = sum(chain.from_iterable(received))/n_received
             else:
                 group_grade = mwrp.NULL_GRADE
-            for full_name in full_names:
-                if self.grades_from_report[full_name]['submitted']:
-                    grades[full_name]['submission'] = group_grade
-                else:
-                    grades[full_name]['submission'] = 0
-        for full_name in grades:
-            # `submission` cannot be `mwrp.NULL_GRADE`
-            submission = grades[full_name]['submission']
-            assessment = self.grades_from_report[full_name]['grading']
-            assessment = assessment if assessment is not mwrp.NULL_GRADE else 0
-            # We assume that submission and assessment grades are
-            # properly normalized and therefore can be summed up
-            grades[full_name]['overall'] = submission + assessment
+            for full_name, mapping in members:
+                # As a student cannot belong to more than one group,
+                # the grades of each member are computed only once
+                submission = group_grade if mapping['submitted'] else 0
+                assessment = mapping['grading']
+                if assessment is mwrp.NULL_GRADE:
+                    assessment = 0
+                # We assume that submission and assessment grades are
+                # properly normalized and therefore can be summed up
+                grades[full_name] = {
+                    'submission': submission,
+                    'grading': assessment,
+                    'overall': submission + assessment,
+                }
         return grades
     
     
@@ -594,14 +661,13 @@ class Workshop():
               '  Submission  Assessment  Overall\n'
               '------------------------------------'
               '------------------------------------')
-        for user in sorted(self.course.users):
-            full_name = user.full_name
-            if full_name in self.grades:
-                submission = self.grades[full_name]['submission']
-                assessment = self.grades_from_report[full_name]['grading']
-                if assessment == mwrp.NULL_GRADE:
-                    assessment = 0
-                overall = self.grades[full_name]['overall']
+        for user in self.course.users:
+            # Users who did not take part in the workshop are skipped
+            grades = self.grades.get(user.full_name)
+            if grades is not None:
+                submission = grades['submission']
+                assessment = grades['grading']
+                overall = grades['overall']
                 print(f'{user.id_number:<9d}  '
                       f'{user.full_name:30}{submission:10.2f}'
                       f'{assessment:12.2f}{overall:9.2f}')
@@ -635,31 +701,32 @@ class Workshop():
         - Assessment (float, two decimal places)
         - Overall (float, two decimal places)
         """
+        rows = [[
+            'ID number',
+            'Name',
+            'Submission',
+            'Assessment',
+            'Overall',
+        ]]
+        for user in self.course.users:
+            # Users who did not take part in the workshop are skipped
+            grades = self.grades.get(user.full_name)
+            if grades is not None:
+                submission = grades['submission']
+                assessment = grades['grading']
+                overall = grades['overall']
+                rows.append([
+                    user.id_number,
+                    user.full_name,
+                    f'{submission:4.2f}',
+                    f'{assessment:4.2f}',
+                    f'{overall:4.2f}',
+                ])
         with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
             writer = csv.writer(csvfile, delimiter=',')
-            writer.writerow([
-                'ID number',
-                'Name',
-                'Submission',
-                'Assessment',
-                'Overall',
-            ])
-            for user in sorted(self.course.users):
-                full_name = user.full_name
-                if full_name in self.grades.keys():
-                    submission = self.grades[full_name]['submission']
-                    assessment = self.grades_from_report[full_name]['grading']
-                    if assessment == mwrp.NULL_GRADE:
-                        assessment = 0
-                    overall = self.grades[full_name]['overall']
-                    writer.writerow([
-                        user.id_number,
-                        user.full_name,
-                        f'{submission:4.2f}',
-                        f'{assessment:4.2f}',
-                        f'{overall:4.2f}',
-                    ])
+            writer.writerows(rows)
 
 
 if __name__ == '__main__':
+    import doctest
     doctest.testmod()
\ No newline at end of file
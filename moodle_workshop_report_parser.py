@@ -3,45 +3,195 @@ Helper functions for parsing a Moodle workshop grades report
 exported as a `bs4.BeautifulSoup` object.
 """
 
-import doctest
+from functools import cached_property, lru_cache
 import re
+import sys
+
+from bs4 import BeautifulSoup, SoupStrainer
+# Fail on import rather than on the first parse if the 'lxml' tree
+# builder used by `make_soup` is not available
+import lxml  # noqa: F401
+import soupsieve
+
+try:
+    # Optional drop-in replacement for `float` with a faster parser
+    from fastnumbers import float as _to_float
+except ImportError:
+    _to_float = float
 
 
 NULL_GRADE = '-'
 
+_ID_RE = re.compile(r'id=(\d+)')
+
+_COURSE_ID_RE = re.compile(r'"courseId"\s*:\s*(\d+)')
+
+_COMMA_TO_DOT = str.maketrans({',': '.'})
+
+# Participant data rows have an empty class attribute, except for the
+# last one, whose class is 'lastrow'
+_DATA_ROWS = soupsieve.compile('tr[class=""], tr[class="lastrow"]')
+
+# Link to a user profile and grade within a report cell
+_USER_LINK = soupsieve.compile('a.d-inline-block.aabtn')
+_GRADE_SPAN = soupsieve.compile('span.grade')
+
+# Link to the submitted work within a submission cell
+_SUBMISSION_TITLE = soupsieve.compile('a.title')
+
+_BREADCRUMB = soupsieve.compile('ol.breadcrumb')
+
+# Group selection menu and its options, except the default one:
+# All participants
+_GROUP_SELECT = soupsieve.compile(
+    'select[name="group"]:is(.custom-select, .singleselect)'
+)
+_GROUP_OPTIONS = soupsieve.compile('option:not([value="0"])')
+
 NO_SUBMISSION = (
     'No submission found for this user',
     'No se han encontrado envíos de este usuario',
     'Non se atoparon entregas deste usuario',
 )
 
-PARTICIPANT_CELLS = (
+PARTICIPANT_CELLS = frozenset({
     'participant cell c0',
-)
+})
 
-SUBMISSION_CELLS = (
+SUBMISSION_CELLS = frozenset({
     'submission cell c1',
-)
+})
 
-GIVEN_GRADE_CELLS = (
+GIVEN_GRADE_CELLS = frozenset({
     'givengrade notnull cell c0 lastcol',
     'givengrade notnull cell c1 lastcol',
     'givengrade notnull cell c4',
-)
+})
 
-RECEIVED_GRADE_CELLS = (
+RECEIVED_GRADE_CELLS = frozenset({
     'receivedgrade notnull cell c0',
     'receivedgrade notnull cell c2',
     'receivedgrade notnull cell c0 lastcol',
-)
+})
 
-SUBMISSION_GRADE_CELLS = (
+SUBMISSION_GRADE_CELLS = frozenset({
     'submissiongrade cell c3',
-)
+})
 
-GRADING_GRADE_CELLS = (
+GRADING_GRADE_CELLS = frozenset({
     'gradinggrade cell c5 lastcol',
-)
+})
+
+# Maps the class string of a report cell to the kind of cell
+CELL_KIND = {
+    **dict.fromkeys(PARTICIPANT_CELLS, 'participant'),
+    **dict.fromkeys(SUBMISSION_CELLS, 'submission'),
+    **dict.fromkeys(RECEIVED_GRADE_CELLS, 'received'),
+    **dict.fromkeys(GIVEN_GRADE_CELLS, 'given'),
+    **dict.fromkeys(SUBMISSION_GRADE_CELLS, 'submission_grade'),
+    **dict.fromkeys(GRADING_GRADE_CELLS, 'grading_grade'),
+}
+
+# Strainers restricting parsing to the section of the page that each
+# extractor needs: breadcrumb (titles), group selector (group IDs),
+# scripts (course ID) and grades table (rows and grades)
+BREADCRUMB_STRAINER = SoupStrainer('ol', class_='breadcrumb')
+GROUP_SELECT_STRAINER = SoupStrainer('select', attrs={'name': 'group'})
+SCRIPT_STRAINER = SoupStrainer('script')
+TABLE_STRAINER = SoupStrainer('table')
+
+# Only these elements (and their descendants) are needed by the
+# `extract_*` functions, so the rest of the page is not parsed.
+REPORT_STRAINER = SoupStrainer(['ol', 'select', 'script', 'table'])
+
+# Same as `REPORT_STRAINER` for callers that pass the HTML code to
+# `extract_course_id`, which then does not need the scripts.
+REPORT_NO_SCRIPT_STRAINER = SoupStrainer(['ol', 'select', 'table'])
+
+
+def make_soup(html, parse_only=REPORT_STRAINER):
+    """
+    Parse the HTML code of a workshop grades report.
+
+    The 'lxml' parser is always used, and by default only the parts
+    of the page that are required for extracting information from
+    the report (breadcrumb, group selector, scripts and tables) are
+    built into the tree.
+
+    Parameters
+    ----------
+    html : str or bytes
+        The HTML code of a workshop grades report (Moodle page).
+    parse_only : bs4.SoupStrainer or None, optional
+        Restricts parsing to the matching elements. Defaults to
+        `REPORT_STRAINER`. If `None`, the whole document is parsed.
+        Use one of the section strainers (`BREADCRUMB_STRAINER`,
+        `GROUP_SELECT_STRAINER`, `SCRIPT_STRAINER` or
+        `TABLE_STRAINER`) when only one extractor will be called.
+
+    Returns
+    -------
+    bs4.BeautifulSoup
+        Parsed HTML content of the grades report.
+
+    Examples
+    --------
+    >>> html = '''
+    ...     <html><body>
+    ...         <div class="navbar">Skip to main content</div>
+    ...         <ol class="breadcrumb"><li>Workshop: Essay</li></ol>
+    ...     </body></html>'''
+    >>> soup = make_soup(html)
+    >>> soup.find('div') is None
+    True
+    >>> soup.find('ol').get_text(strip=True)
+    'Workshop: Essay'
+    >>> make_soup(html, parse_only=None).find('div').get_text()
+    'Skip to main content'
+    >>> extract_workshop_title(make_soup(html, BREADCRUMB_STRAINER))
+    'Workshop: Essay'
+    """
+    return BeautifulSoup(html, 'lxml', parse_only=parse_only)
+
+
+def stripped_text(tag):
+    """
+    Return the text of a tag with surrounding whitespace removed.
+
+    When the tag has a single string child, which is the case for
+    grade spans and menu options, that string is used directly
+    instead of collecting the text of all the descendants.
+
+    Parameters
+    ----------
+    tag : bs4.element.Tag
+        A BeautifulSoup tag.
+
+    Returns
+    -------
+    str
+        The text of the tag, stripped.
+
+    Examples
+    --------
+    >>> from bs4 import BeautifulSoup
+    >>> soup = BeautifulSoup(
+    ...     '<p> Group 1_1 </p><p> <b>Group</b> 2_1 </p>', 'lxml'
+    ... )
+    >>> [stripped_text(tag) for tag in soup.find_all('p')]
+    ['Group 1_1', 'Group2_1']
+    """
+    text = tag.string
+    if text is None:
+        return tag.get_text(strip=True)
+    return text.strip()
+
+
+@lru_cache(maxsize=512)
+def _parse_grade(text):
+    """Convert the text of a grade, which often recurs, into a float."""
+    # Decimal separator can be a ','
+    return _to_float(text.translate(_COMMA_TO_DOT))
 
 
 def get_grade(grade_tag):
@@ -59,6 +209,11 @@ def get_grade(grade_tag):
     -------
     float
         The extracted numeric grade.
+
+    Notes
+    -----
+    If the optional package `fastnumbers` is installed, its faster
+    drop-in replacement for `float` is used to parse the text.
             
     Examples
     --------
@@ -74,13 +229,41 @@ def get_grade(grade_tag):
     >>> get_grade(tag2)
     81.3
     """
-    text = grade_tag.get_text(strip=True)
-    try:
-        grade = float(text)
-    except ValueError:
-        # Decimal separator can be a ','
-        grade = float(text.replace(',', '.'))
-    return grade
+    return _parse_grade(stripped_text(grade_tag))
+
+
+def extract_breadcrumb(soup):
+    """
+    Extract the breadcrumb navigation bar of the report.
+
+    Parameters
+    ----------
+    soup : bs4.BeatifulSoup or bs4.element.Tag
+        The content of a workshop grades report (Moodle page), or
+        the breadcrumb `<ol>` element itself, which is then returned
+        unchanged.
+
+    Returns
+    -------
+    bs4.element.Tag or None
+        The `<ol class="breadcrumb">` element, or `None` if the
+        report has no breadcrumb.
+
+    Examples
+    --------
+    >>> from bs4 import BeautifulSoup
+    >>> soup = BeautifulSoup(
+    ...     '<div><ol class="breadcrumb"><li>Home</li></ol></div>', 'lxml'
+    ... )
+    >>> breadcrumb = extract_breadcrumb(soup)
+    >>> breadcrumb.name
+    'ol'
+    >>> extract_breadcrumb(breadcrumb) is breadcrumb
+    True
+    """
+    if soup.name == 'ol' and 'breadcrumb' in soup.get('class', ()):
+        return soup
+    return _BREADCRUMB.select_one(soup)
 
 
 def extract_workshop_title(soup):
@@ -92,8 +275,9 @@ def extract_workshop_title(soup):
 
     Parameters
     ----------
-    soup : bs4.BeatifulSoup
-        The content of a workshop grades report (Moodle page).
+    soup : bs4.BeatifulSoup or bs4.element.Tag
+        The content of a workshop grades report (Moodle page),
+        or its breadcrumb as returned by `extract_breadcrumb`.
 
     Returns
     -------
@@ -135,7 +319,7 @@ def extract_workshop_title(soup):
     >>> extract_workshop_title(soup)
     'Workshop: Carbonate Content Analysis'
     """
-    breadcrumb = soup.find('ol', class_='breadcrumb')
+    breadcrumb = extract_breadcrumb(soup)
     last_li = breadcrumb.find_all('li')[-1]
     return last_li.get_text(strip=True)
 
@@ -145,12 +329,16 @@ def extract_course_title(soup):
     Extract the course title from the breadcrumb navigation bar.
 
     The course title is obtained from the first `<a>` tag in the
-    breadcrumb that includes a `title` attribute.
+    breadcrumb that includes a `title` attribute. When both titles
+    are needed, pass the result of `extract_breadcrumb` to this
+    function and to `extract_workshop_title` so that the breadcrumb
+    is searched for only once.
 
     Parameters
     ----------
-    soup : bs4.BeatifulSoup
-        The content of a workshop grades report (Moodle page).
+    soup : bs4.BeatifulSoup or bs4.element.Tag
+        The content of a workshop grades report (Moodle page),
+        or its breadcrumb as returned by `extract_breadcrumb`.
 
     Returns
     -------
@@ -192,13 +380,25 @@ def extract_course_title(soup):
     >>> extract_course_title(soup)
     'Geology for Dummies'
     """
-    breadcrumb = soup.find('ol', class_='breadcrumb')
-    for a_tag in breadcrumb.find_all('a'):
-        if a_tag.has_attr('title'):
-            return a_tag['title']
+    breadcrumb = extract_breadcrumb(soup)
+    a_tag = breadcrumb.find('a', title=True)
+    if a_tag is not None:
+        return a_tag['title']
 
 
-def extract_course_id(soup):
+def _match_course_id(content):
+    """Match the value of `courseId` in the text of a script."""
+    if not content:
+        return None
+    idx = content.find('"courseId"')
+    if idx < 0:
+        return None
+    # Start matching at the key rather than scanning the whole script
+    return (_COURSE_ID_RE.match(content, idx)
+            or _COURSE_ID_RE.search(content, idx))
+
+
+def extract_course_id(soup, html_text=None):
     """
     Extract the value of `courseId` from a BeautifulSoup object.
 
@@ -206,6 +406,10 @@ def extract_course_id(soup):
     ----------
     soup : bs4.BeatifulSoup
         The content of a workshop grades report (Moodle page).
+    html_text : str or None, optional
+        The HTML code `soup` was built from. If provided, it is
+        searched directly, which is faster than visiting the parsed
+        `<script>` tags. Defaults to `None`.
 
     Returns
     -------
@@ -243,14 +447,16 @@ def extract_course_id(soup):
     >>> extract_course_id(bad_soup) # doctest: +IGNORE_EXCEPTION_DETAIL
     Traceback (most recent call last):
     AttributeError: Unable to extract "courseId".
+    >>> extract_course_id(good_soup, html_text=good_script)
+    22862
     """
-    for script_tag in soup.find_all('script'):
-        content = script_tag.string
-        if not content or 'courseId' not in content:
-            continue
-        found = re.search(r'"courseId"\s*:\s*(\d+)', content)
+    if html_text is not None:
+        found = _match_course_id(html_text)
         if found:
             return int(found.group(1))
+    script_tag = soup.find('script', string=_match_course_id)
+    if script_tag is not None:
+        return int(_match_course_id(script_tag.string).group(1))
     raise AttributeError('Unable to extract "courseId".')
 
 
@@ -300,18 +506,16 @@ def extract_group_ids(soup):
     >>> soup = BeautifulSoup(form, 'lxml')
     >>> extract_group_ids(soup)
     ['Group 1_1', 'Group 1_2', 'Group 2_1', 'Group 2_2', 'Group 2_3']
+    >>> extract_group_ids(BeautifulSoup('<div></div>', 'lxml'))
+    Traceback (most recent call last):
+        ...
+    AttributeError: No group selection menu found.
     """
-    select_tag = soup.find('select', attrs={
-        'class': ['custom-select', 'singleselect'],
-        'name': 'group'
-    })
-    option_tags = select_tag.find_all('option')
-    group_ids = set()
-    for option in option_tags:
-        # Discard default option: All participants
-        if option['value'] != '0':
-            group_ids.add(option.get_text(strip=True))
-    return sorted(group_ids)
+    select_tag = _GROUP_SELECT.select_one(soup)
+    if select_tag is None:
+        raise AttributeError('No group selection menu found.')
+    option_tags = _GROUP_OPTIONS.select(select_tag)
+    return sorted(dict.fromkeys(stripped_text(tag) for tag in option_tags))
 
 
 def extract_rows(soup):
@@ -345,11 +549,7 @@ def extract_rows(soup):
     tbody = first_table.find('tbody')
     if tbody is None:
         raise AttributeError('No <tbody> found in the first table.')
-    rows = []
-    for tr in tbody.find_all('tr'):
-        if tr.has_attr('class') and tr['class'] in ([], ['lastrow']):
-            rows.append(tr)
-    return rows
+    return _DATA_ROWS.select(tbody)
 
 
 def extract_fullnames(soup):
@@ -367,18 +567,153 @@ def extract_fullnames(soup):
     """
     participants = []
     for row in extract_rows(soup):
-        td = row.find('td',class_=lambda x: x in PARTICIPANT_CELLS)
-        if td:
-            participants.append(td.contents[-1].text)
+        for td in row.find_all('td', recursive=False):
+            if ' '.join(td.get('class', ())) in PARTICIPANT_CELLS:
+                # `contents` is the cell's own list of children, and
+                # the name in the last one is usually a single string
+                last_child = td.contents[-1]
+                name = last_child.string
+                if name is None:
+                    name = last_child.get_text()
+                participants.append(str(name))
+                break
     return participants
 
 
-def extract_grades(soup):
+def _view_id(link, cache):
+    """
+    Return the view ID of the user profile `link` points to, or
+    `None` if there is none. The same profile links appear many
+    times in a report, so IDs are stored in `cache` by URL.
+    """
+    if link is None:
+        return None
+    href = link.get('href', '')
+    view_id = cache.get(href)
+    if view_id is None:
+        match_id = _ID_RE.search(href)
+        if match_id is None:
+            return None
+        view_id = cache[href] = int(match_id.group(1))
+    return view_id
+
+
+def _grade_cell_data(td, view_ids):
+    """
+    Return `(view_id, grade)` from a received or given grade cell,
+    where `view_id` identifies the linked user, or `None` if the
+    cell is malformed.
+    """
+    view_id = _view_id(_USER_LINK.select_one(td), view_ids)
+    grade_tag = _GRADE_SPAN.select_one(td)
+    if view_id is None or grade_tag is None:
+        return None
+    try:
+        grade = get_grade(grade_tag)
+    except ValueError as ex:
+        print(ex)
+        return None
+    return view_id, grade
+
+
+def iter_report_cells(soup, rows=None):
+    """
+    Extract the raw data of the workshop report table, cell by cell.
+
+    This is the traversal step of `extract_grades`: the rows of the
+    report are scanned once, and the information found in each cell
+    is yielded as a plain tuple, so that it can be aggregated without
+    touching the parse tree again. Malformed cells are reported and
+    skipped.
+
+    Parameters
+    ----------
+    soup : bs4.BeatifulSoup
+        The content of a workshop grades report (Moodle page).
+    rows : list of bs4.element.Tag or None, optional
+        The data rows of the report, as returned by `extract_rows`
+        (e.g. `ParsedReport.rows`), so that the table does not need
+        to be searched again. If `None`, they are extracted from
+        `soup`.
+
+    Yields
+    ------
+    tuple
+        Tuples `(kind, view_id, value)`, where `view_id` is the
+        Moodle ID of the participant the row belongs to, and `kind`
+        and `value` are one of:
+        - 'participant', full name of the participant.
+        - 'submission', `None` (only yielded if work was submitted).
+        - 'received', `(grader_view_id, grade)`.
+        - 'given', `(gradee_view_id, grade)`.
+        - 'submission_grade', grade (only if not `NULL_GRADE`).
+        - 'grading_grade', grade (only if not `NULL_GRADE`).
+    """
+    if rows is None:
+        rows = extract_rows(soup)
+    view_ids = dict()  # Profile URL -> view ID
+    for row in rows:
+        # Visit the cells of the row just once and dispatch on their
+        # kind instead of searching the row for each kind of cell
+        for td in row.find_all('td', recursive=False):
+            kind = CELL_KIND.get(' '.join(td.get('class', ())))
+            if kind is None:
+                continue
+
+            # Extract participant view_id (from link) and full name (`alt`)
+            if kind == 'participant':
+                view_id = _view_id(_USER_LINK.select_one(td), view_ids)
+                spans = td.find_all('span')
+                if view_id is None or not spans:
+                    print('Skipping malformed participant cell')
+                    break  # Skip the remaining cells of this row
+                participant_view_id = view_id
+                participant_alt = stripped_text(spans[-1])
+                yield kind, participant_view_id, participant_alt
+
+            # Set 'submitted' to True is a submission is found 
+            elif kind == 'submission':
+                title_tag = _SUBMISSION_TITLE.select_one(td)
+                if title_tag:
+                    yield kind, participant_view_id, None
+
+            # Extract received and given grades
+            elif kind == 'received' or kind == 'given':
+                data = _grade_cell_data(td, view_ids)
+                if data is None:
+                    print(f'Skipping malformed {kind}grade cell')
+                    continue
+                yield kind, participant_view_id, data
+
+            # Extract submission grade
+            elif kind == 'submission_grade':
+                if td.get_text() != NULL_GRADE:
+                    yield kind, participant_view_id, get_grade(td)
+
+            # Extract grading grade
+            elif kind == 'grading_grade':
+                if td.get_text() != NULL_GRADE:
+                    yield kind, participant_view_id, get_grade(td)
+
+
+class _ParticipantGrades():
+    """Grades of a participant, keyed by view ID, while being collected."""
+    __slots__ = ('submitted', 'received', 'given', 'submission', 'grading')
+
+    def __init__(self):
+        self.submitted = False
+        self.received = dict()
+        self.given = dict()
+        self.submission = NULL_GRADE
+        self.grading = NULL_GRADE
+
+
+def extract_grades(soup, rows=None):
     """
     Extract peer assessment grades from the workshop report table.
 
-    Parses each relevant table row to build a nested dictionary of
-    grades, including:
+    Aggregates the cell data yielded by `iter_report_cells` into a
+    nested dictionary of grades, including:
     - A boolean flag indicating whether the student submitted
       an assignment.
     - Grades received by each participant from peers.
@@ -393,6 +728,11 @@ def extract_grades(soup):
     ----------
     soup : bs4.BeatifulSoup
         The content of a workshop grades report (Moodle page).
+    rows : list of bs4.element.Tag or None, optional
+        The data rows of the report, as returned by `extract_rows`
+        (e.g. `ParsedReport.rows`), so that the table does not need
+        to be searched again. If `None`, they are extracted from
+        `soup`.
 
     Returns
     -------
@@ -414,126 +754,185 @@ def extract_grades(soup):
         or duplicated full names are detected.
     """
     view_id_to_grades = dict()
-    alt_to_grades = dict()
     view_id_to_alt = dict()
-    for row in extract_rows(soup):
-        # Extract participant view_id (from link) and full name (`alt`)
-        td_participant = row.find(
-            'td',
-            class_=lambda x: x in PARTICIPANT_CELLS,
-        )
-        if td_participant:
-            try:
-                link = td_participant.find('a', class_='d-inline-block aabtn')
-                match_id = re.search(r'id=(\d+)', link['href'])
-                participant_view_id = int(match_id.group(1))
-                spans = td_participant.find_all("span")
-                participant_alt = spans[-1].get_text(strip=True)
-                view_id_to_alt[participant_view_id] = participant_alt
-                view_id_to_grades[participant_view_id] = {
-                    'submitted': False,
-                    'received': dict(),
-                    'given': dict(),
-                    'submission': NULL_GRADE,
-                    'grading': NULL_GRADE,
-                }
-            except BaseException as ex:
-                print(ex)
-                print('Skipping malformed participant cell')
-                continue
-
-        # Set 'submitted' to True is a submission is found 
-        td_submission = row.find('td', class_=lambda x: x in SUBMISSION_CELLS)
-        if td_submission:
-            title_tag = td_submission.find('a', class_='title')
-            if title_tag:
-                view_id_to_grades[participant_view_id]['submitted'] = True
-
-        # Extract received grades
-        td_received = row.find(
-            'td',
-            class_=lambda x: x in RECEIVED_GRADE_CELLS,
-        )
-        if td_received:
-            try:
-                link = td_received.find('a', class_='d-inline-block aabtn')
-                match_id = re.search(r'id=(\d+)', link['href'])
-                grader_view_id = int(match_id.group(1)) if match_id else None
-                grade_tag = td_received.find('span', class_='grade')
-                grade = get_grade(grade_tag)
-                view_id_to_grades[participant_view_id]['received'][
-                    grader_view_id
-                ] = grade
-            except BaseException as ex:
-                print(ex)
-                print('Skipping malformed receivedgrade cell')
-                
-        # Extract given grades
-        td_given = row.find('td', class_=lambda x: x in GIVEN_GRADE_CELLS)
-        if td_given:
-            try:
-                link = td_given.find('a', class_='d-inline-block aabtn')
-                match_id = re.search(r'id=(\d+)', link['href'])
-                gradee_view_id = int(match_id.group(1))
-                grade_tag = td_given.find('span', class_='grade')
-                grade = get_grade(grade_tag)
-                view_id_to_grades[participant_view_id]['given'][
-                    gradee_view_id
-                ] = grade
-            except BaseException as ex:
-                print(ex)
-                print('Skipping malformed receivedgrade cell')
-
-        # Extract submission grade
-        td_submission_grade = row.find(
-            'td',
-            class_=lambda x: x in SUBMISSION_GRADE_CELLS,
-        )
-        if td_submission_grade:
-            if td_submission_grade.get_text() != NULL_GRADE:
-                grade = get_grade(td_submission_grade)
-                view_id_to_grades[participant_view_id]['submission'] = grade
-
-        # Extract submission grade
-        td_grading_grade = row.find(
-            'td',
-            class_=lambda x: x in GRADING_GRADE_CELLS,
-        )
-        if td_grading_grade:
-            if td_grading_grade.get_text() != NULL_GRADE:
-                grade = get_grade(td_grading_grade)
-                view_id_to_grades[participant_view_id]['grading'] = grade
+    # Each grade appears twice in the report (received by the gradee
+    # and given by the grader). Both copies are compared as soon as
+    # the second one is found, and the pairs are counted so that
+    # grades without a counterpart are detected at the end
+    n_received = n_given = n_paired = 0
+    mismatches = []
+    for kind, view_id, value in iter_report_cells(soup, rows):
+        if kind == 'participant':
+            # Full names are used over and over as dictionary keys
+            view_id_to_alt[view_id] = sys.intern(value)
+            view_id_to_grades[view_id] = _ParticipantGrades()
+        elif kind == 'submission':
+            view_id_to_grades[view_id].submitted = True
+        elif kind == 'received':
+            grader_view_id, grade = value
+            view_id_to_grades[view_id].received[grader_view_id] = grade
+            n_received += 1
+            grader = view_id_to_grades.get(grader_view_id)
+            if grader is not None and view_id in grader.given:
+                n_paired += 1
+                if grader.given[view_id] != grade:
+                    mismatches.append((view_id, grader_view_id))
+        elif kind == 'given':
+            gradee_view_id, grade = value
+            view_id_to_grades[view_id].given[gradee_view_id] = grade
+            n_given += 1
+            gradee = view_id_to_grades.get(gradee_view_id)
+            if gradee is not None and view_id in gradee.received:
+                n_paired += 1
+                if gradee.received[view_id] != grade:
+                    mismatches.append((gradee_view_id, view_id))
+        elif kind == 'submission_grade':
+            view_id_to_grades[view_id].submission = value
+        elif kind == 'grading_grade':
+            view_id_to_grades[view_id].grading = value
 
     # Sanity checks
-    for gradee in view_id_to_grades:
-        for grader in view_id_to_grades[gradee]['received']:
-            gradee_from_grader = view_id_to_grades[gradee]['received'][grader]
-            grader_to_gradee = view_id_to_grades[grader]['given'][gradee]
-            if gradee_from_grader != grader_to_gradee:
-                raise ValueError('Error parsing grades')
-    if len(view_id_to_alt) > len(set(view_id_to_alt.keys())):
+    if mismatches or not n_received == n_given == n_paired:
+        raise ValueError(f'Error parsing grades: {n_received - n_paired} '
+                         f'received and {n_given - n_paired} given grades '
+                         f'without counterpart, (gradee, grader) view IDs '
+                         f'with mismatching grades: {mismatches}')
+    if len(view_id_to_alt) != len(set(view_id_to_alt.values())):
         raise ValueError('ERROR: Different users have identical full names')
         
     # Change key of dictionary
-    for participant_view_id in view_id_to_grades:
-        alt = view_id_to_alt[participant_view_id]
-        received = dict()
-        for grader_view_id, grade in view_id_to_grades[participant_view_id][
-                'received'].items():
-            received[view_id_to_alt[grader_view_id]] = grade
-        given = dict()
-        for gradee_view_id, grade in view_id_to_grades[participant_view_id][
-                'given'].items():
-            given[view_id_to_alt[gradee_view_id]] = grade
-        alt_to_grades[alt] = {
-            'submitted': view_id_to_grades[participant_view_id]['submitted'],
-            'received': received,
-            'given': given,
-            'submission': view_id_to_grades[participant_view_id]['submission'],
-            'grading': view_id_to_grades[participant_view_id]['grading'],
+    alt_to_grades = {
+        view_id_to_alt[participant_view_id]: {
+            'submitted': record.submitted,
+            'received': {view_id_to_alt[grader_view_id]: grade
+                         for grader_view_id, grade
+                         in record.received.items()},
+            'given': {view_id_to_alt[gradee_view_id]: grade
+                      for gradee_view_id, grade
+                      in record.given.items()},
+            'submission': record.submission,
+            'grading': record.grading,
         }
+        for participant_view_id, record in view_id_to_grades.items()
+    }
     return alt_to_grades
 
 
+class ParsedReport():
+    """
+    Information extracted from a workshop grades report.
+
+    Each piece of information is extracted the first time it is
+    accessed and then cached, so every section of the page
+    (breadcrumb, scripts, group selector and grades table) is
+    searched for at most once, and only if needed.
+
+    Parameters
+    ----------
+    soup : bs4.BeatifulSoup
+        The content of a workshop grades report (Moodle page).
+    html_text : str or None, optional
+        The HTML code `soup` was built from, passed on to
+        `extract_course_id`. Defaults to `None`.
+
+    Attributes
+    ----------
+    soup : bs4.BeatifulSoup
+        The content of the workshop grades report.
+    html_text : str or None
+        The HTML code of the report, if provided.
+    breadcrumb : bs4.element.Tag
+        The breadcrumb navigation bar.
+    workshop_title : str
+        Title of the workshop, as shown in the breadcrumb.
+    course_title : str or None
+        Title of the course, as shown in the breadcrumb.
+    course_id : int
+        The Moodle-assigned course identifier.
+    group_ids : list of str
+        Sorted group names listed in the group selection menu.
+    rows : list of bs4.element.Tag
+        The participant data rows of the grades table.
+    grades : dict
+        Peer assessment grades of the participants, as returned by
+        `extract_grades`.
+
+    Examples
+    --------
+    >>> html = '''
+    ...     <ol class="breadcrumb">
+    ...         <li><a href="view.php?id=22862" title="Geology">GEO</a></li>
+    ...         <li><span>Workshop: Carbonates</span></li>
+    ...     </ol>'''
+    >>> report = ParsedReport(make_soup(html))
+    >>> report
+    ParsedReport(extracted=())
+    >>> report.course_title
+    'Geology'
+    >>> report
+    ParsedReport(extracted=('breadcrumb', 'course_title'))
+    >>> report = ParsedReport(make_soup('<table></table>'))
+    >>> report
+    ParsedReport(extracted=())
+    >>> report.workshop_title
+    Traceback (most recent call last):
+        ...
+    AttributeError: No breadcrumb found.
+    """
+    _SECTIONS = (
+        'breadcrumb',
+        'workshop_title',
+        'course_title',
+        'course_id',
+        'group_ids',
+        'rows',
+        'grades',
+    )
+
+    def __init__(self, soup, html_text=None):
+        self.soup = soup
+        self.html_text = html_text
+
+    def __repr__(self):
+        # Only report what has already been extracted (and cached in
+        # the instance dictionary), as extracting it here could fail
+        # on the very page one is trying to debug
+        extracted = tuple(name for name in self._SECTIONS
+                          if name in self.__dict__)
+        return f'{self.__class__.__name__}({extracted=})'
+
+    @cached_property
+    def breadcrumb(self):
+        breadcrumb = extract_breadcrumb(self.soup)
+        if breadcrumb is None:
+            raise AttributeError('No breadcrumb found.')
+        return breadcrumb
+
+    @cached_property
+    def workshop_title(self):
+        return extract_workshop_title(self.breadcrumb)
+
+    @cached_property
+    def course_title(self):
+        return extract_course_title(self.breadcrumb)
+
+    @cached_property
+    def course_id(self):
+        return extract_course_id(self.soup, self.html_text)
+
+    @cached_property
+    def group_ids(self):
+        return extract_group_ids(self.soup)
+
+    @cached_property
+    def rows(self):
+        return extract_rows(self.soup)
+
+    @cached_property
+    def grades(self):
+        return extract_grades(self.soup, rows=self.rows)
+
+
 if __name__ == '__main__':
+    import doctest
     doctest.testmod()
\ No newline at end of file
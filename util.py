@@ -1,4 +1,5 @@
 from configparser import ConfigParser
+from functools import lru_cache
 from pathlib import Path
 from tkinter import Tk, filedialog
 import unicodedata
@@ -8,12 +9,14 @@ class DirNotFoundError(Exception):
     pass
 
 
+@lru_cache(maxsize=4096)
 def normalize(text):
     """
     Remove accents from a string and convert to lowercase.
 
     Helper function for sorting strings in a way that ignores
-    diacritical marks (accents) and case.
+    diacritical marks (accents) and case. Results are cached, as
+    the same names and group IDs are normalized over and over.
 
     Parameters
     ----------
@@ -37,6 +40,9 @@ def normalize(text):
     >>> sorted(names, key=normalize)  # Normalized order
     ['ana', 'ángel', 'Elena', 'María', 'Marta', 'Óscar']
     """
+    if text.isascii():
+        # Nothing to decompose (e.g. most group IDs)
+        return text.lower()
     return ''.join(
         c for c in unicodedata.normalize('NFKD', text)
         if not unicodedata.combining(c)